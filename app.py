@@ -3,12 +3,15 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_caching import Cache
 from polla_futbol import PollaFutbol
+from buscar_partido import buscar_partidos
 from dotenv import load_dotenv
 import json
 from pymongo import MongoClient
 from pymongo.server_api import ServerApi
 import requests
 import datetime
+import hmac
+import time
 import pytz
 from flask import current_app
 
@@ -20,6 +23,11 @@ cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT':
 api_call_count = 0
 
 PREDICCION_MINUTOS_LIMITE = int(os.environ.get('PREDICCION_MINUTOS_LIMITE', 5))
+PARTIDO_INFO_CACHE_KEY = 'view//partido-info'
+PARTIDO_INFO_CACHE_TIMEOUT = 172800
+# Epoch UTC hasta el que se aceptan registros/actualizaciones; se calcula una vez por fixture
+registro_deadline_epoch = None
+ENDPOINTS_CON_DEADLINE = {'crear_participante', 'actualizar_participante'}
 
 @app.route('/resultados', methods=['GET'])
 @cache.cached()
@@ -43,6 +51,9 @@ def get_resultados():
             "error": "No se pudo obtener la información del partido. Intente nuevamente en unos minutos."
         }), 503
 
+    if not match_data.get('respaldo'):
+        refrescar_deadline(match_data.get('timestamp'))
+
     results = polla.process_match(match_id, match_data=match_data)
     print(f"[LOG] results calculados: {results}")
 
@@ -137,10 +148,12 @@ def buscar_participante():
 
 def get_cached_partido_info():
     """Obtiene la info general del partido usando el caché de /partido-info."""
-    cache_key = 'view//partido-info'
-    data = cache.get(cache_key)
+    global registro_deadline_epoch
+    data = cache.get(PARTIDO_INFO_CACHE_KEY)
     if data is not None:
         print('[LOG] get_cached_partido_info: Usando datos cacheados')
+        if registro_deadline_epoch is None:
+            registro_deadline_epoch = data.get('deadline_epoch')
         return data
     # Si no está en caché, llamar a la lógica de partido_info y guardar en caché
     print('[LOG] get_cached_partido_info: No hay datos en caché, obteniendo y cacheando')
@@ -173,36 +186,75 @@ def get_cached_partido_info():
         if not data.get('response') or not data['response']:
             return None
         match = data['response'][0]
+    fixture = match.get('fixture', {})
     result = {
         'match_id': match_id,
         'id_polla': os.getenv('ID_POLLA'),
-        'fixture': match.get('fixture', {}),
+        'fixture': fixture,
         'league': match.get('league', {}),
-        'teams': match.get('teams', {})
+        'teams': match.get('teams', {}),
+        'deadline_epoch': calcular_deadline_epoch(fixture)
     }
-    cache.set(cache_key, result, timeout=172800)
+    registro_deadline_epoch = result['deadline_epoch']
+    print(f"[LOG] get_cached_partido_info: deadline_epoch={registro_deadline_epoch}")
+    cache.set(PARTIDO_INFO_CACHE_KEY, result, timeout=PARTIDO_INFO_CACHE_TIMEOUT)
     return result
 
+def calcular_deadline_epoch(fixture):
+    """Epoch UTC en el que se cierran los registros: inicio del partido menos PREDICCION_MINUTOS_LIMITE."""
+    timestamp = fixture.get('timestamp')
+    if timestamp is None:
+        fecha_partido_str = fixture.get('date')
+        if not fecha_partido_str:
+            return None
+        timestamp = datetime.datetime.fromisoformat(fecha_partido_str.replace('Z', '+00:00')).timestamp()
+    return int(timestamp) - PREDICCION_MINUTOS_LIMITE * 60
+
+def refrescar_deadline(timestamp):
+    """Recalcula el deadline si el fixture cambió de hora (p. ej. partido aplazado)."""
+    global registro_deadline_epoch
+    if timestamp is None:
+        return
+    nuevo_deadline = int(timestamp) - PREDICCION_MINUTOS_LIMITE * 60
+    if nuevo_deadline == registro_deadline_epoch:
+        return
+    print(f"[LOG] refrescar_deadline: deadline_epoch {registro_deadline_epoch} -> {nuevo_deadline}")
+    registro_deadline_epoch = nuevo_deadline
+    data = cache.get(PARTIDO_INFO_CACHE_KEY)
+    if data is not None:
+        fixture = dict(data.get('fixture', {}))
+        fixture['timestamp'] = int(timestamp)
+        fixture['date'] = datetime.datetime.fromtimestamp(int(timestamp), pytz.UTC).isoformat()
+        data = dict(data, fixture=fixture, deadline_epoch=nuevo_deadline)
+        cache.set(PARTIDO_INFO_CACHE_KEY, data, timeout=PARTIDO_INFO_CACHE_TIMEOUT)
+
 def puede_registrar_o_actualizar():
-    """Valida si se puede registrar/actualizar según la fecha del partido."""
-    partido_info = get_cached_partido_info()
-    if not partido_info:
-        return False, 'No se pudo obtener la información del partido para validar el tiempo.'
-    fixture = partido_info.get('fixture', {})
-    fecha_partido_str = fixture.get('date')
-    timezone = fixture.get('timezone', 'UTC')
-    if not fecha_partido_str:
-        return False, 'No se encontró la fecha del partido'
-    # Parsear fecha del partido en UTC
-    fecha_partido = datetime.datetime.fromisoformat(fecha_partido_str.replace('Z', '+00:00'))
-    fecha_partido_utc = fecha_partido.astimezone(pytz.UTC)
-    ahora_utc = datetime.datetime.now(pytz.UTC)
-    diferencia = (fecha_partido_utc - ahora_utc).total_seconds() / 60  # minutos
-    print(f"[LOG] Validación de tiempo: ahora_utc={ahora_utc}, fecha_partido_utc={fecha_partido_utc}, diferencia_minutos={diferencia}")
-    if diferencia <= PREDICCION_MINUTOS_LIMITE:
+    """Valida si se puede registrar/actualizar según el deadline precalculado del partido."""
+    deadline = registro_deadline_epoch
+    if deadline is None:
+        # Solo ocurre en el primer registro tras arrancar o si no se pudo calcular el deadline
+        partido_info = get_cached_partido_info()
+        if not partido_info:
+            return False, 'No se pudo obtener la información del partido para validar el tiempo.'
+        deadline = partido_info.get('deadline_epoch')
+        if deadline is None:
+            return False, 'No se encontró la fecha del partido'
+    if int(time.time()) >= deadline:
         return False, f'¡El tiempo para registrar o modificar tu predicción ha terminado! Solo puedes hacerlo hasta {PREDICCION_MINUTOS_LIMITE} minutos antes del inicio del partido.'
     return True, None
 
+@app.before_request
+def validar_deadline_registro():
+    """Rechaza registros/actualizaciones tardías antes de leer el body o tocar MongoDB."""
+    # Los preflight OPTIONS de CORS deben pasar: un 403 ahí el navegador lo ve como error de red
+    if request.endpoint not in ENDPOINTS_CON_DEADLINE or request.method not in ('POST', 'PUT'):
+        return None
+    ok, msg = puede_registrar_o_actualizar()
+    if not ok:
+        print(f"[LOG] {request.path}: Bloqueado por tiempo: {msg}")
+        return jsonify({'error': msg}), 403
+    return None
+
 @app.route('/actualizar-participante', methods=['PUT'])
 def actualizar_participante():
     data = request.get_json()
@@ -212,11 +264,6 @@ def actualizar_participante():
     if not id_polla or not phone:
         print("[LOG] /actualizar-participante: Faltan parámetros")
         return jsonify({'error': 'Faltan parámetros'}), 400
-    # Validar tiempo
-    ok, msg = puede_registrar_o_actualizar()
-    if not ok:
-        print(f"[LOG] /actualizar-participante: Actualización bloqueada por tiempo: {msg}")
-        return jsonify({'error': msg}), 403
     mongo_uri = os.getenv('MONGO_URI')
     client = MongoClient(mongo_uri, server_api=ServerApi('1'))
     db = client['pollafutbol']
@@ -237,11 +284,6 @@ def actualizar_participante():
 def crear_participante():
     data = request.get_json()
     print(f"[LOG] /crear-participante: Datos recibidos: {data}")
-    # Validar tiempo
-    ok, msg = puede_registrar_o_actualizar()
-    if not ok:
-        print(f"[LOG] /crear-participante: Registro bloqueado por tiempo: {msg}")
-        return jsonify({'error': msg}), 403
     # Validar campos requeridos
     required_fields = ['id_polla', 'name', 'phone', 'winner', 'first_half_score', 'second_half_score']
     for field in required_fields:
@@ -299,6 +341,29 @@ def partido_info():
         return jsonify({'error': 'No se pudo obtener la información del partido'}), 500
     return jsonify(data)
 
+@app.route('/registro-deadline', methods=['GET'])
+def registro_deadline():
+    """Cuenta regresiva del cierre de registros para que el cliente no tenga que sondear /partido-info.
+
+    Un aplazamiento solo se detecta cuando /resultados se recalcula (caché de 5 minutos) o
+    cuando expira /partido-info, así que el cliente debe volver a consultar este endpoint
+    periódicamente en lugar de confiar en un único deadline_epoch.
+    """
+    deadline = registro_deadline_epoch
+    if deadline is None:
+        partido_info = get_cached_partido_info()
+        deadline = partido_info.get('deadline_epoch') if partido_info else None
+    if deadline is None:
+        return jsonify({'error': 'No se pudo obtener la información del partido'}), 500
+    ahora = int(time.time())
+    return jsonify({
+        'deadline_epoch': deadline,
+        'ahora_epoch': ahora,
+        'segundos_restantes': max(deadline - ahora, 0),
+        'abierto': ahora < deadline,
+        'minutos_limite': PREDICCION_MINUTOS_LIMITE
+    })
+
 @app.route('/participantes', methods=['GET'])
 def participantes():
     id_polla_env = os.getenv('ID_POLLA')
@@ -323,5 +388,32 @@ def participantes():
     print(f"[LOG] /participantes: Encontrados {len(participantes)} participantes")
     return jsonify(participantes)
 
+@app.route('/admin/buscar-partido', methods=['GET'])
+def admin_buscar_partido():
+    admin_token = os.getenv('ADMIN_TOKEN')
+    if not admin_token:
+        print("[LOG] /admin/buscar-partido: ADMIN_TOKEN no configurado, endpoint deshabilitado")
+        return jsonify({'error': 'No autorizado'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({'error': 'No autorizado'}), 401
+    team1 = request.args.get('team1')
+    team2 = request.args.get('team2')
+    desde_str = request.args.get('desde') or request.args.get('fecha')
+    hasta_str = request.args.get('hasta') or desde_str
+    print(f"[LOG] /admin/buscar-partido: desde={desde_str}, hasta={hasta_str}, team1={team1}, team2={team2}")
+    if not team1 or not desde_str:
+        return jsonify({'error': 'Faltan parámetros'}), 400
+    try:
+        desde = datetime.date.fromisoformat(desde_str)
+        hasta = datetime.date.fromisoformat(hasta_str)
+    except ValueError:
+        return jsonify({'error': 'Las fechas deben tener formato YYYY-MM-DD'}), 400
+    try:
+        resultado = buscar_partidos(desde, hasta, team1, team2)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    print(f"[LOG] /admin/buscar-partido: Encontrados {len(resultado['partidos'])} partidos")
+    return jsonify(resultado)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 10000)))
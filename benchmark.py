@@ -0,0 +1,413 @@
+"""Benchmark reproducible de la polla.
+
+Siembra pools sintéticos de participantes en un mongod local (o en mongomock
+con --mongo memoria), sirve la API de football desde ejemplo_api_football.json
+(develop_mode=TRUE) y mide:
+
+- throughput de PollaFutbol.load_participants_from_mongo
+- throughput de PollaFutbol.process_match
+- latencia p50/p99 y RPS de /resultados, /participantes y /crear-participante
+  con clientes concurrentes
+- pico de memoria por fase (tracemalloc) y RSS máximo del proceso
+
+Los resultados se escriben en JSON para comparar entre corridas.
+
+Uso:
+    python benchmark.py --tamanos 1000 100000 1000000 --salida bench_output.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_JSON = 'ejemplo_api_football.json'
+# Los pools del benchmark usan ids altos para no chocar con pollas reales
+ID_POLLA_BASE = 900000
+LOTE_INSERCION = 10000
+# La app no crea índices: solo se usa con --con-indice para comparar contra el escaneo completo
+INDICE_BENCH = [('id_polla', 1), ('phone', 1)]
+
+# Marcadores por tiempo con pesos aproximados a los que la gente suele pronosticar
+MARCADORES_TIEMPO = [
+    ('0-0', 30), ('1-0', 22), ('0-1', 14), ('1-1', 12), ('2-0', 7),
+    ('0-2', 4), ('2-1', 5), ('1-2', 3), ('3-0', 1), ('2-2', 1), ('3-1', 1),
+]
+
+
+def cargar_fixture():
+    with open(os.path.join(DIRECTORIO, FIXTURE_JSON), 'r', encoding='utf-8') as f:
+        return json.load(f)['response'][0]
+
+
+def generar_participantes(id_polla, cantidad, home_team, away_team, semilla):
+    """Genera predicciones agrupadas alrededor de los marcadores más comunes."""
+    rnd = random.Random(semilla)
+    marcadores = [m for m, _ in MARCADORES_TIEMPO]
+    pesos = [p for _, p in MARCADORES_TIEMPO]
+    for i in range(cantidad):
+        first_half = rnd.choices(marcadores, pesos)[0]
+        second_half = rnd.choices(marcadores, pesos)[0]
+        first_home, first_away = map(int, first_half.split('-'))
+        second_home, second_away = map(int, second_half.split('-'))
+        final_home = first_home + second_home
+        final_away = first_away + second_away
+        if final_home > final_away:
+            winner = home_team
+        elif final_home < final_away:
+            winner = away_team
+        else:
+            winner = rnd.choice(['empate', 'draw'])
+        yield {
+            'id_polla': id_polla,
+            'name': f'Participante {i}',
+            'phone': f'3{i:09d}',
+            'winner': winner,
+            'first_half_score': first_half,
+            'second_half_score': second_half
+        }
+
+
+def sembrar_pool(collection, id_polla, cantidad, home_team, away_team, semilla):
+    collection.delete_many({'id_polla': id_polla})
+    lote = []
+    for doc in generar_participantes(id_polla, cantidad, home_team, away_team, semilla):
+        lote.append(doc)
+        if len(lote) >= LOTE_INSERCION:
+            collection.insert_many(lote, ordered=False)
+            lote = []
+    if lote:
+        collection.insert_many(lote, ordered=False)
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(ordenados) - 1)
+    return ordenados[f] + (ordenados[c] - ordenados[f]) * (k - f)
+
+
+def resumir_latencias(latencias, duracion, errores):
+    ms = [l * 1000 for l in latencias]
+    return {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'duracion_s': round(duracion, 4),
+        'rps': round(len(latencias) / duracion, 2) if duracion else None,
+        'p50_ms': round(percentil(ms, 50), 3) if ms else None,
+        'p99_ms': round(percentil(ms, 99), 3) if ms else None,
+        'media_ms': round(statistics.mean(ms), 3) if ms else None,
+        'max_ms': round(max(ms), 3) if ms else None
+    }
+
+
+@contextlib.contextmanager
+def silenciar():
+    """Descarta los print de [LOG] para no medir la consola."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def medir_pico_memoria(funcion):
+    tracemalloc.start()
+    try:
+        with silenciar():
+            funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico
+
+
+def medir_carga(polla, iteraciones):
+    tiempos = []
+    total = 0
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        with silenciar():
+            participants = polla.load_participants_from_mongo()
+        tiempos.append(time.perf_counter() - inicio)
+        total = len(participants)
+    media = statistics.mean(tiempos)
+    return {
+        'iteraciones': iteraciones,
+        'participantes': total,
+        'media_s': round(media, 4),
+        'min_s': round(min(tiempos), 4),
+        'docs_por_s': round(total / media, 2) if media else None,
+        'pico_memoria_bytes': medir_pico_memoria(polla.load_participants_from_mongo)
+    }
+
+
+def medir_scoring(polla, match_id, match_data, iteraciones):
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        with silenciar():
+            polla.process_match(match_id, match_data=match_data)
+        tiempos.append(time.perf_counter() - inicio)
+    media = statistics.mean(tiempos)
+    total = len(polla.participants)
+    return {
+        'iteraciones': iteraciones,
+        'participantes': total,
+        'media_s': round(media, 4),
+        'min_s': round(min(tiempos), 4),
+        'participantes_por_s': round(total / media, 2) if media else None,
+        'pico_memoria_bytes': medir_pico_memoria(
+            lambda: polla.process_match(match_id, match_data=match_data)
+        )
+    }
+
+
+def cargar_endpoint(base_url, metodo, ruta, peticiones, concurrencia, cuerpo=None):
+    """Lanza `peticiones` contra el endpoint repartidas entre `concurrencia` clientes."""
+    contador = iter(range(peticiones))
+    lock = threading.Lock()
+    latencias = []
+    errores = [0]
+
+    def cliente():
+        session = requests.Session()
+        while True:
+            with lock:
+                i = next(contador, None)
+            if i is None:
+                return
+            kwargs = {'json': cuerpo(i)} if cuerpo else {}
+            inicio = time.perf_counter()
+            try:
+                response = session.request(metodo, f'{base_url}{ruta}', **kwargs)
+                ok = response.status_code < 400
+            except requests.exceptions.RequestException:
+                ok = False
+            transcurrido = time.perf_counter() - inicio
+            with lock:
+                latencias.append(transcurrido)
+                if not ok:
+                    errores[0] += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        for _ in range(concurrencia):
+            executor.submit(cliente)
+    return resumir_latencias(latencias, time.perf_counter() - inicio, errores[0])
+
+
+def preparar_partido_info(app_module):
+    """Mueve el cierre de registros a mañana para que /crear-participante no responda 403.
+
+    Se hace con refrescar_deadline, el mismo camino que usa /resultados ante un aplazamiento,
+    porque las peticiones a /resultados lo dejan en la hora (pasada) de ejemplo_api_football.json.
+    """
+    inicio = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    app_module.refrescar_deadline(int(inicio.timestamp()))
+
+
+def medir_endpoints(app_module, base_url, id_polla, match_id, fixture, args):
+    os.environ['ID_POLLA'] = str(id_polla)
+    app_module.cache.clear()
+    resultados = {}
+
+    # /resultados en frío: se limpia la caché de la vista antes de cada petición
+    latencias = []
+    errores = 0
+    inicio_total = time.perf_counter()
+    for _ in range(args.iteraciones_frio):
+        app_module.cache.delete('view//resultados')
+        inicio = time.perf_counter()
+        try:
+            with silenciar():
+                response = requests.get(f'{base_url}/resultados')
+            ok = response.status_code < 400
+        except requests.exceptions.RequestException:
+            ok = False
+        latencias.append(time.perf_counter() - inicio)
+        if not ok:
+            errores += 1
+    resultados['resultados_frio'] = resumir_latencias(
+        latencias, time.perf_counter() - inicio_total, errores
+    )
+    resultados['resultados_frio']['pico_memoria_bytes'] = medir_pico_memoria(
+        lambda: (app_module.cache.delete('view//resultados'),
+                 app_module.app.test_client().get('/resultados'))
+    )
+
+    with silenciar():
+        resultados['resultados'] = cargar_endpoint(
+            base_url, 'GET', '/resultados', args.peticiones, args.concurrencia
+        )
+        resultados['participantes'] = cargar_endpoint(
+            base_url, 'GET', '/participantes',
+            min(args.peticiones, args.peticiones_listado), args.concurrencia
+        )
+        home_team = fixture['teams']['home']['name']
+        preparar_partido_info(app_module)
+        resultados['crear_participante'] = cargar_endpoint(
+            base_url, 'POST', '/crear-participante', args.peticiones, args.concurrencia,
+            cuerpo=lambda i: {
+                'id_polla': id_polla,
+                'name': f'Bench {i}',
+                'phone': f'9{i:09d}',
+                'winner': home_team,
+                'first_half_score': '1-0',
+                'second_half_score': '0-0'
+            }
+        )
+    return resultados
+
+
+def configurar_entorno(args, match_id):
+    # La salida es relativa al directorio desde donde se lanzó el benchmark
+    args.salida = os.path.abspath(args.salida)
+    os.chdir(DIRECTORIO)
+    os.environ['develop_mode'] = 'TRUE'
+    os.environ['FORCE_API_ERROR'] = 'false'
+    os.environ['SAVE_JSON'] = 'FALSE'
+    os.environ['MATCH_ID'] = str(match_id)
+    os.environ['MONGO_URI'] = args.mongo_uri
+
+
+def conectar_mongo(args):
+    """Devuelve un MongoClient real o uno de mongomock compartido por todo el proceso."""
+    import app as app_module
+    import polla_futbol
+    if args.mongo == 'memoria':
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit('[BENCH] --mongo memoria requiere instalar mongomock')
+        cliente = mongomock.MongoClient()
+        fabrica = lambda *a, **kw: cliente
+        polla_futbol.MongoClient = fabrica
+        app_module.MongoClient = fabrica
+        return app_module, cliente
+    from pymongo import MongoClient
+    from pymongo.server_api import ServerApi
+    return app_module, MongoClient(args.mongo_uri, server_api=ServerApi('1'))
+
+
+def iniciar_servidor(app_module, puerto):
+    from werkzeug.serving import make_server
+    servidor = make_server('127.0.0.1', puerto, app_module.app, threaded=True)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    return servidor, f'http://127.0.0.1:{servidor.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la polla futbolera')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--mongo', choices=['local', 'memoria'], default='local')
+    parser.add_argument('--mongo-uri', default=os.getenv('BENCH_MONGO_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--iteraciones', type=int, default=3)
+    parser.add_argument('--iteraciones-frio', type=int, default=3)
+    parser.add_argument('--peticiones', type=int, default=200)
+    parser.add_argument('--peticiones-listado', type=int, default=50)
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--puerto', type=int, default=0)
+    parser.add_argument('--sin-endpoints', action='store_true')
+    parser.add_argument('--con-indice', action='store_true',
+                        help='Crear un índice (id_polla, phone) durante la corrida; se borra al terminar')
+    parser.add_argument('--conservar', action='store_true', help='No borrar los pools sembrados al terminar')
+    parser.add_argument('--salida', default='bench_output.json')
+    args = parser.parse_args()
+
+    fixture = cargar_fixture()
+    match_id = fixture['fixture']['id']
+    configurar_entorno(args, match_id)
+    app_module, cliente = conectar_mongo(args)
+    from polla_futbol import PollaFutbol
+
+    collection = cliente['pollafutbol']['participantes']
+    home_team = fixture['teams']['home']['name']
+    away_team = fixture['teams']['away']['name']
+    with silenciar():
+        match_data = PollaFutbol.__new__(PollaFutbol).get_match_details(match_id)
+
+    servidor, base_url = (None, None)
+    if not args.sin_endpoints:
+        servidor, base_url = iniciar_servidor(app_module, args.puerto)
+
+    reporte = {
+        'fecha': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'mongo': args.mongo,
+        'semilla': args.semilla,
+        'match_id': match_id,
+        'parametros': {
+            'iteraciones': args.iteraciones,
+            'peticiones': args.peticiones,
+            'concurrencia': args.concurrencia,
+            'con_indice': args.con_indice
+        },
+        'pools': []
+    }
+    indice_creado = None
+    try:
+        if args.con_indice:
+            existentes = {tuple(info['key']) for info in collection.index_information().values()}
+            if tuple(INDICE_BENCH) not in existentes:
+                indice_creado = collection.create_index(INDICE_BENCH)
+        for i, cantidad in enumerate(args.tamanos):
+            id_polla = ID_POLLA_BASE + i
+            print(f'[BENCH] Sembrando pool id_polla={id_polla} con {cantidad} participantes')
+            inicio = time.perf_counter()
+            sembrar_pool(collection, id_polla, cantidad, home_team, away_team, args.semilla + i)
+            siembra = time.perf_counter() - inicio
+
+            with silenciar():
+                polla = PollaFutbol(id_polla=id_polla)
+            pool = {
+                'id_polla': id_polla,
+                'participantes': cantidad,
+                'siembra_s': round(siembra, 4)
+            }
+            print(f'[BENCH] Midiendo load_participants_from_mongo ({cantidad})')
+            pool['load_participants_from_mongo'] = medir_carga(polla, args.iteraciones)
+            print(f'[BENCH] Midiendo process_match ({cantidad})')
+            pool['process_match'] = medir_scoring(polla, match_id, match_data, args.iteraciones)
+            del polla
+            if servidor:
+                print(f'[BENCH] Midiendo endpoints ({cantidad})')
+                pool['endpoints'] = medir_endpoints(
+                    app_module, base_url, id_polla, match_id, fixture, args
+                )
+            reporte['pools'].append(pool)
+    finally:
+        if servidor:
+            servidor.shutdown()
+        if indice_creado:
+            collection.drop_index(indice_creado)
+        if not args.conservar:
+            collection.delete_many({'id_polla': {'$gte': ID_POLLA_BASE,
+                                                 '$lt': ID_POLLA_BASE + len(args.tamanos)}})
+
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    reporte['rss_max_bytes'] = maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f'[BENCH] Resultados guardados en {args.salida}')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,238 @@
+import datetime
+import difflib
+import json
 import os
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def buscar_partido_por_fecha(fecha, team1, team2):
-    api_key = os.getenv('FOOTBALL_API_KEY')
-    base_url = 'https://v3.football.api-sports.io'
-    headers = {
-        'x-rapidapi-key': api_key,
+BASE_URL = 'https://v3.football.api-sports.io'
+FIXTURES_CACHE_DIR = os.getenv('FIXTURES_CACHE_DIR', 'fixtures_cache')
+# Los días de hoy en adelante pueden cambiar (aplazamientos, horarios), así que se refrescan
+FIXTURES_CACHE_TTL = int(os.getenv('FIXTURES_CACHE_TTL', 600))
+MAX_DESCARGAS_CONCURRENTES = int(os.getenv('MAX_DESCARGAS_CONCURRENTES', 4))
+MAX_DIAS_BUSQUEDA = int(os.getenv('MAX_DIAS_BUSQUEDA', 31))
+SIMILITUD_MINIMA = 0.8
+
+# fecha -> (mtime del archivo de caché, IndiceEquipos del día); el índice se arma una vez por versión del archivo
+_indices_por_dia = {}
+
+
+def _headers():
+    return {
+        'x-rapidapi-key': os.getenv('FOOTBALL_API_KEY'),
         'x-rapidapi-host': 'v3.football.api-sports.io'
     }
 
-    url = f"{base_url}/fixtures"
-    params = {
-        'date': fecha  # formato: 'YYYY-MM-DD'
+
+def normalizar_nombre(nombre):
+    """Minúsculas, sin tildes y sin signos: 'Independiente Medellín' -> 'independiente medellin'."""
+    descompuesto = unicodedata.normalize('NFKD', nombre or '')
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', sin_tildes.lower()).split())
+
+
+def _resumir_fixture(match):
+    """Guarda solo lo necesario para buscar, no la respuesta completa de la API."""
+    return {
+        'match_id': match['fixture']['id'],
+        'date': match['fixture'].get('date'),
+        'status': match['fixture'].get('status', {}).get('short'),
+        'home_team': match['teams']['home']['name'],
+        'away_team': match['teams']['away']['name'],
+        'league': match.get('league', {}).get('name'),
+        'country': match.get('league', {}).get('country')
     }
 
+
+def _ruta_cache(fecha):
+    return os.path.join(FIXTURES_CACHE_DIR, f'{fecha.isoformat()}.json')
+
+
+def _leer_cache(fecha):
+    ruta = _ruta_cache(fecha)
+    fin_dia = datetime.datetime.combine(
+        fecha + datetime.timedelta(days=1), datetime.time(), datetime.timezone.utc
+    ).timestamp()
+    try:
+        guardado = os.path.getmtime(ruta)
+        # Solo es definitiva la caché descargada después de terminado el día (UTC);
+        # la guardada antes puede tener estados previos al partido o aplazamientos
+        if guardado < fin_dia and time.time() - guardado > FIXTURES_CACHE_TTL:
+            return None
+        en_memoria = _indices_por_dia.get(fecha)
+        if en_memoria and en_memoria[0] == guardado:
+            return en_memoria[1].fixtures
+        with open(ruta, 'r', encoding='utf-8') as f:
+            fixtures = json.load(f)
+    except (OSError, ValueError):
+        return None
+    _indices_por_dia[fecha] = (guardado, IndiceEquipos(fixtures))
+    return fixtures
+
+
+def _guardar_cache(fecha, fixtures):
+    os.makedirs(FIXTURES_CACHE_DIR, exist_ok=True)
+    ruta = _ruta_cache(fecha)
+    tmp = f'{ruta}.tmp'
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if not data['response']:
-            print("No se encontraron partidos para esa fecha")
-            return
-
-        print(f"\nPartidos encontrados el {fecha}:")
-        for match in data['response']:
-            home_team = match['teams']['home']['name']
-            away_team = match['teams']['away']['name']
-            match_id = match['fixture']['id']
-            print(f"ID: {match_id} | {home_team} vs {away_team}")
-            if (team1.lower() in home_team.lower() and team2.lower() in away_team.lower()) or \
-               (team2.lower() in home_team.lower() and team1.lower() in away_team.lower()):
-                print(f"--> ¡Este es el partido que buscas! ID: {match_id}")
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error al buscar el partido: {e}")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(fixtures, f, ensure_ascii=False)
+        os.replace(tmp, ruta)
+        _indices_por_dia[fecha] = (os.path.getmtime(ruta), IndiceEquipos(fixtures))
+    except OSError as e:
+        print(f"[LOG] Error guardando caché de fixtures {ruta}: {e}")
+
+
+def _descargar_fixtures(fecha):
+    print(f"[LOG] Llamando a la API de football para fixtures del {fecha.isoformat()}")
+    response = requests.get(
+        f"{BASE_URL}/fixtures",
+        headers=_headers(),
+        params={'date': fecha.isoformat()},  # formato: 'YYYY-MM-DD'
+        timeout=15
+    )
+    response.raise_for_status()
+    data = response.json()
+    # La API reporta cuota agotada o key inválida con 200, 'errors' y response vacío
+    if data.get('errors'):
+        raise requests.exceptions.HTTPError(f"La API respondió con errores: {data['errors']}", response=response)
+    return [_resumir_fixture(match) for match in data.get('response') or []]
+
+
+def obtener_fixtures_rango(desde, hasta):
+    """Devuelve ({fecha: [fixtures]}, [fechas fallidas]) usando la caché en disco.
+
+    Los días que faltan en la caché se descargan en paralelo.
+    """
+    if hasta < desde:
+        raise ValueError('La fecha final no puede ser anterior a la inicial')
+    dias = (hasta - desde).days + 1
+    if dias > MAX_DIAS_BUSQUEDA:
+        raise ValueError(f'El rango máximo de búsqueda es de {MAX_DIAS_BUSQUEDA} días')
+
+    fechas = [desde + datetime.timedelta(days=i) for i in range(dias)]
+    fixtures_por_fecha = {}
+    faltantes = []
+    for fecha in fechas:
+        cacheado = _leer_cache(fecha)
+        if cacheado is None:
+            faltantes.append(fecha)
+        else:
+            fixtures_por_fecha[fecha] = cacheado
+
+    fallidas = []
+    if faltantes:
+        print(f"[LOG] Fixtures sin caché: {len(faltantes)} de {dias} días")
+        with ThreadPoolExecutor(max_workers=MAX_DESCARGAS_CONCURRENTES) as executor:
+            futuros = {fecha: executor.submit(_descargar_fixtures, fecha) for fecha in faltantes}
+        for fecha, futuro in futuros.items():
+            try:
+                fixtures = futuro.result()
+            except (requests.exceptions.RequestException, KeyError, TypeError, AttributeError, ValueError) as e:
+                # También respuestas con otra forma: el día cuenta como fallido, no rompe la búsqueda
+                print(f"[LOG] Error al buscar los partidos del {fecha.isoformat()}: {e}")
+                fallidas.append(fecha)
+                continue
+            _guardar_cache(fecha, fixtures)
+            fixtures_por_fecha[fecha] = fixtures
+    return {fecha: fixtures_por_fecha[fecha] for fecha in fechas if fecha in fixtures_por_fecha}, fallidas
+
+
+class IndiceEquipos:
+    """Índice de nombres de equipo normalizados sobre una lista de fixtures."""
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+        self._por_nombre = defaultdict(list)  # nombre normalizado -> [(posición, lado)]
+        self._por_token = defaultdict(set)    # token -> nombres normalizados que lo contienen
+        for posicion, fixture in enumerate(fixtures):
+            for lado in ('home', 'away'):
+                nombre = normalizar_nombre(fixture[f'{lado}_team'])
+                self._por_nombre[nombre].append((posicion, lado))
+                for token in nombre.split():
+                    self._por_token[token].add(nombre)
+
+    def _nombres_para_token(self, token):
+        if token in self._por_token:
+            return self._por_token[token]
+        # Sin coincidencia exacta: prefijos ('indep') y errores de tipeo ('medelin')
+        nombres = set()
+        for candidato in self._por_token:
+            if (len(token) >= 3 and candidato.startswith(token)) or \
+               difflib.SequenceMatcher(None, token, candidato).ratio() >= SIMILITUD_MINIMA:
+                nombres |= self._por_token[candidato]
+        return nombres
+
+    def buscar_equipo(self, equipo):
+        """Devuelve {posición: lado} de los fixtures donde juega un equipo parecido a `equipo`."""
+        tokens = normalizar_nombre(equipo).split()
+        if not tokens:
+            return {}
+        nombres = self._nombres_para_token(tokens[0])
+        for token in tokens[1:]:
+            nombres = nombres & self._nombres_para_token(token)
+        encontrados = {}
+        for nombre in nombres:
+            for posicion, lado in self._por_nombre[nombre]:
+                encontrados[posicion] = lado
+        return encontrados
+
+    def buscar(self, team1, team2=None):
+        """Fixtures donde juega team1 y, si se indica, team2 del otro lado."""
+        equipo1 = self.buscar_equipo(team1)
+        if team2 is None:
+            posiciones = sorted(equipo1)
+        else:
+            equipo2 = self.buscar_equipo(team2)
+            posiciones = sorted(
+                p for p, lado in equipo1.items() if p in equipo2 and equipo2[p] != lado
+            )
+        return [self.fixtures[p] for p in posiciones]
+
+
+def _indice_del_dia(fecha, fixtures):
+    en_memoria = _indices_por_dia.get(fecha)
+    if en_memoria and en_memoria[1].fixtures is fixtures:
+        return en_memoria[1]
+    # Solo pasa si no se pudo guardar la caché del día
+    return IndiceEquipos(fixtures)
+
+
+def buscar_partidos(desde, hasta, team1, team2=None):
+    """Busca partidos de team1 (contra team2 si se indica) entre dos fechas, ambas incluidas."""
+    fixtures_por_fecha, fallidas = obtener_fixtures_rango(desde, hasta)
+    partidos = []
+    for fecha, fixtures in fixtures_por_fecha.items():
+        partidos.extend(_indice_del_dia(fecha, fixtures).buscar(team1, team2))
+    return {
+        'partidos': partidos,
+        'fechas_fallidas': [fecha.isoformat() for fecha in fallidas]
+    }
+
+
+def buscar_partido_por_fecha(fecha, team1, team2):
+    """Partidos entre team1 y team2 en una fecha 'YYYY-MM-DD', con las fechas que no se pudieron consultar."""
+    dia = datetime.date.fromisoformat(fecha)
+    return buscar_partidos(dia, dia, team1, team2)
+
 
 if __name__ == "__main__":
     fecha = input("Ingresa la fecha (YYYY-MM-DD): ")
-    buscar_partido_por_fecha(fecha, "Medellin", "America") 
\ No newline at end of file
+    resultado = buscar_partido_por_fecha(fecha, "Medellin", "America")
+    partidos = resultado['partidos']
+    if resultado['fechas_fallidas']:
+        print("Error al buscar el partido: no se pudo consultar la API para esa fecha")
+    elif not partidos:
+        print("No se encontraron partidos para esa fecha")
+    for partido in partidos:
+        print(f"--> ¡Este es el partido que buscas! ID: {partido['match_id']} | "
+              f"{partido['home_team']} vs {partido['away_team']}")
@@ -92,7 +92,10 @@ class PollaFutbol:
                         'second_half_score': f"{second_half_home}-{second_half_away}",
                         'winner': winner,
                         'venue': match['fixture']['venue'],
-                        'status': match['fixture']['status']
+                        'status': match['fixture']['status'],
+                        'timestamp': match['fixture'].get('timestamp'),
+                        # El respaldo puede ser viejo o de otro partido: no sirve para recalcular el deadline
+                        'respaldo': True
                     }
             except Exception as e:
                 print(f"[LOG] Error cargando api_football_response.json como respaldo: {e}")
@@ -152,7 +155,8 @@ class PollaFutbol:
                     'second_half_score': f"{second_half_home}-{second_half_away}",
                     'winner': winner,
                     'venue': match['fixture']['venue'],
-                    'status': match['fixture']['status']
+                    'status': match['fixture']['status'],
+                    'timestamp': match['fixture'].get('timestamp')
                 }
         else:
             print('[LOG] MODO PRODUCTIVO: Llamando a la API de football')
@@ -211,7 +215,8 @@ class PollaFutbol:
                         'second_half_score': f"{second_half_home}-{second_half_away}",
                         'winner': winner,
                         'venue': match['fixture']['venue'],
-                        'status': match['fixture']['status']
+                        'status': match['fixture']['status'],
+                        'timestamp': match['fixture'].get('timestamp')
                     }
         return None
 